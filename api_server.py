@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Headless JSON API for the sector-relative valuation analysis.
+
+Exposes the same get_sector_etf -> get_sector_holdings ->
+get_comparative_metrics -> generate_company_description flow used by the
+Streamlit app, without a browser session.
+
+Endpoints:
+    GET  /health
+    GET  /analysis/<SYMBOL>[?model=llama3.2&refresh=1]
+    GET  /analysis?symbols=AAPL,MSFT[&model=llama3.2]
+    POST /analysis/bulk    {"symbols": ["AAPL", "MSFT"], "model": "llama3.2"}
+
+Run with:
+    python api_server.py --port 8502
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+import pandas as pd
+
+from utils import get_sector_etf, get_sector_holdings, get_comparative_metrics, generate_company_description, summarize_sector_metrics, new_fetch_planner, ANALYSIS_FIELDS, MODEL_OPTIONS
+from symbol_index import load_symbol_index, normalize_symbol
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = MODEL_OPTIONS[0]
+DEFAULT_TTL_SECONDS = 900
+MAX_BULK_SYMBOLS = 50
+PEER_LIMIT = 10
+
+
+def _records(df):
+    """
+    Convert a DataFrame to JSON-safe records (NaN becomes null)
+    """
+    if df is None or df.empty:
+        return []
+    df = df.reset_index()
+    return df.astype(object).where(pd.notna(df), None).to_dict(orient="records")
+
+
+def run_analysis(symbol, model=DEFAULT_MODEL):
+    """
+    Run the full sector-relative analysis for one symbol and return a JSON-safe dict
+    """
+    planner = new_fetch_planner()
+    info = planner.fetch(symbol, ANALYSIS_FIELDS)
+
+    sector_etf, sector_name = get_sector_etf(symbol, planner=planner)
+    peers = pd.DataFrame()
+    weights = None
+    if sector_etf:
+        weights = get_sector_holdings(sector_etf)
+        peers = get_comparative_metrics(weights.index[:PEER_LIMIT].tolist(), planner=planner)
+
+    return {
+        "symbol": symbol,
+        "company": info.get("longName"),
+        "sector": info.get("sector"),
+        "industry": info.get("industry"),
+        "sector_etf": sector_etf,
+        "sector_name": sector_name,
+        "metrics": {
+            "Current Price": info.get("currentPrice"),
+            "P/E": info.get("trailingPE"),
+            "P/B": info.get("priceToBook"),
+            "PEG": info.get("pegRatio"),
+            "Forward P/E": info.get("forwardPE"),
+            "Market Cap": info.get("marketCap"),
+            "Analyst Rating": info.get("recommendationMean")
+        },
+        "sector_stats": summarize_sector_metrics(peers, weights),
+        "peers": _records(peers.join(weights) if weights is not None and not peers.empty else peers),
+        "description": generate_company_description(symbol, info, model),
+        "model": model,
+        "fetch_stats": planner.summary()
+    }
+
+
+class AnalysisService:
+    """
+    Caches analysis results and coalesces concurrent requests for the same
+    (symbol, model) pair into a single in-flight computation.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_workers=4, analyze=run_analysis):
+        self.ttl_seconds = ttl_seconds
+        self._analyze = analyze
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._cache = {}      # key -> (result, computed_at)
+        self._inflight = {}   # key -> Future
+
+    def _compute(self, key):
+        symbol, model = key
+        try:
+            result = self._analyze(symbol, model)
+            now = time.time()
+            with self._lock:
+                # Drop expired entries so the cache only holds fresh results
+                for old_key, (_, computed_at) in list(self._cache.items()):
+                    if now - computed_at >= self.ttl_seconds:
+                        del self._cache[old_key]
+                self._cache[key] = (result, now)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _resolve(self, key, refresh=False):
+        """
+        Return (future, None) for a computation or (None, cached_entry) for a fresh cache hit
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and not refresh and time.time() - cached[1] < self.ttl_seconds:
+                return None, cached
+
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._compute, key)
+                self._inflight[key] = future
+        return future, None
+
+    def _finish(self, key, future, cached):
+        if cached:
+            return cached[0], cached[1], True
+        result = future.result()
+        with self._lock:
+            computed_at = self._cache.get(key, (None, time.time()))[1]
+        return result, computed_at, False
+
+    def get(self, symbol, model=DEFAULT_MODEL, refresh=False):
+        """
+        Return (result, computed_at, cache_hit) for one symbol
+        """
+        key = (symbol.upper(), model)
+        return self._finish(key, *self._resolve(key, refresh))
+
+    def get_many(self, symbols, model=DEFAULT_MODEL):
+        """
+        Analyze many symbols concurrently; returns {symbol: (result, computed_at, cache_hit) or Exception}
+        """
+        pending = {}
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            key = (symbol, model)
+            pending[symbol] = (key,) + self._resolve(key)
+
+        results = {}
+        for symbol, (key, future, cached) in pending.items():
+            try:
+                results[symbol] = self._finish(key, future, cached)
+            except Exception as e:
+                results[symbol] = e
+        return results
+
+
+def make_handler(service, symbol_index):
+    class AnalysisHandler(BaseHTTPRequestHandler):
+        server_version = "StockPickerAPI/1.0"
+
+        def log_message(self, format, *args):
+            logger.info("%s - %s", self.address_string(), format % args)
+
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _freshness_headers(self, computed_at, cache_hit):
+            age = max(0, int(time.time() - computed_at))
+            return {
+                "Cache-Control": f"public, max-age={max(0, service.ttl_seconds - age)}",
+                "Age": str(age),
+                "Last-Modified": formatdate(computed_at, usegmt=True),
+                "X-Cache": "HIT" if cache_hit else "MISS"
+            }
+
+        def _bulk(self, symbols, model):
+            if model not in MODEL_OPTIONS:
+                return self._send_json(400, {"error": f"Unknown model '{model}'", "models": MODEL_OPTIONS})
+            symbols = [s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()]
+            if not symbols:
+                return self._send_json(400, {"error": "No symbols provided"})
+            if len(symbols) > MAX_BULK_SYMBOLS:
+                return self._send_json(400, {"error": f"At most {MAX_BULK_SYMBOLS} symbols per request"})
+
+            results, errors, oldest = {}, {}, None
+            symbols = [normalize_symbol(s) for s in symbols]
+            for symbol in symbols:
+                if not symbol_index.is_valid(symbol):
+                    errors[symbol] = "Unknown symbol"
+            known = [s for s in symbols if s not in errors]
+            for symbol, outcome in service.get_many(known, model).items():
+                if isinstance(outcome, Exception):
+                    errors[symbol] = str(outcome)
+                    continue
+                result, computed_at, _ = outcome
+                results[symbol] = result
+                oldest = computed_at if oldest is None else min(oldest, computed_at)
+
+            headers = self._freshness_headers(oldest, False) if oldest else {"Cache-Control": "no-store"}
+            headers.pop("X-Cache", None)
+            self._send_json(200, {"results": results, "errors": errors}, headers)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            model = params.get("model", [DEFAULT_MODEL])[0]
+            parts = [p for p in url.path.split("/") if p]
+
+            if parts == ["health"]:
+                return self._send_json(200, {"status": "ok"})
+
+            if parts == ["analysis"] and "symbols" in params:
+                return self._bulk(",".join(params["symbols"]).split(","), model)
+
+            if len(parts) == 2 and parts[0] == "analysis":
+                # Index and FX symbols arrive percent-encoded, e.g. %5EGSPC for ^GSPC
+                symbol = normalize_symbol(unquote(parts[1]))
+                if not symbol_index.is_valid(symbol):
+                    return self._send_json(404, {"error": "Unknown symbol", "symbol": symbol})
+                if model not in MODEL_OPTIONS:
+                    return self._send_json(400, {"error": f"Unknown model '{model}'", "models": MODEL_OPTIONS})
+                refresh = params.get("refresh", ["0"])[0] in ("1", "true", "yes")
+                try:
+                    result, computed_at, cache_hit = service.get(symbol, model, refresh)
+                except Exception as e:
+                    logger.error(f"Analysis failed for {symbol}: {str(e)}")
+                    return self._send_json(502, {"error": str(e), "symbol": symbol})
+                return self._send_json(200, result, self._freshness_headers(computed_at, cache_hit))
+
+            self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") != "/analysis/bulk":
+                return self._send_json(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                return self._send_json(400, {"error": "Invalid JSON body"})
+            if not isinstance(body, dict):
+                return self._send_json(400, {"error": "Body must be a JSON object"})
+            symbols = body.get("symbols")
+            if not isinstance(symbols, list):
+                return self._send_json(400, {"error": "'symbols' must be a list"})
+            model = body.get("model", DEFAULT_MODEL)
+            if not isinstance(model, str):
+                return self._send_json(400, {"error": "'model' must be a string"})
+            self._bulk(symbols, model)
+
+    return AnalysisHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless JSON API for sector-relative stock analysis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL_SECONDS, help="Seconds a cached analysis stays fresh")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent analyses")
+    args = parser.parse_args()
+
+    service = AnalysisService(ttl_seconds=args.ttl, max_workers=args.workers)
+    symbol_index = load_symbol_index()
+    logger.info(f"Loaded {len(symbol_index)} symbols (full listing: {symbol_index.has_listing})")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, symbol_index))
+    logger.info(f"Serving analysis API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,98 +7,72 @@ from datetime import datetime, timedelta
 import time
 import requests
 import json
-from utils import get_sector_etf, get_sector_constituents
+from utils import get_sector_etf, get_sector_holdings, check_ollama_status, generate_company_description, new_fetch_planner, ANALYSIS_FIELDS, MODEL_OPTIONS, summarize_sector_metrics, compute_weighted_sector_aggregates
+from report_jobs import ReportJobQueue, QueueFullError, build_report_inputs, QUEUED, DONE, FAILED, SUPERSEDED
+from symbol_index import load_symbol_index, normalize_symbol, is_us_listing_symbol
+from chart_utils import line_trace, date_bounds, slice_window, HISTORY_OPTIONS, DEFAULT_CHART_WIDTH_PX
 
-# Function to check if Ollama is running
-def check_ollama_status():
+@st.cache_resource
+def get_symbol_index():
     """
-    Check if Ollama service is running and accessible.
+    Load the local ticker index once per server process
     """
-    try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
+    return load_symbol_index()
 
-# Function to generate company description using Ollama
-def generate_company_description(stock_symbol, stock_info, selected_model):
+@st.cache_resource
+def get_report_queue():
     """
-    Generate an 80-120 word company description using the selected Ollama model.
+    Shared background queue for AI report generation
     """
-    try:
-        # Prepare the prompt with company information
-        company_name = stock_info.get('longName', stock_symbol)
-        sector = stock_info.get('sector', 'N/A')
-        industry = stock_info.get('industry', 'N/A')
-        market_cap = stock_info.get('marketCap', 0)
-        pe_ratio = stock_info.get('trailingPE', 0)
-        description = stock_info.get('longBusinessSummary', '')
-        
-        # Format market cap for readability
-        if market_cap and market_cap > 0:
-            if market_cap >= 1e12:
-                market_cap_str = f"${market_cap/1e12:.1f}T"
-            elif market_cap >= 1e9:
-                market_cap_str = f"${market_cap/1e9:.1f}B"
-            elif market_cap >= 1e6:
-                market_cap_str = f"${market_cap/1e6:.1f}M"
-            else:
-                market_cap_str = f"${market_cap:,.0f}"
-        else:
-            market_cap_str = "N/A"
-        
-        prompt = f"""You are a financial analyst. Write a concise, professional company overview for {company_name} ({stock_symbol}) in exactly 80-120 words. 
+    return ReportJobQueue()
 
-Company Information:
-- Name: {company_name}
-- Symbol: {stock_symbol}
-- Sector: {sector}
-- Industry: {industry}
-- Market Cap: {market_cap_str}
-- P/E Ratio: {pe_ratio if pe_ratio else 'N/A'}
-- Business Description: {description[:500]}{'...' if len(description) > 500 else ''}
+def render_report_job(job_key):
+    """
+    Show progress or the finished report for a background report job
+    """
+    job = get_report_queue().get(job_key)
+    if job is None:
+        return
+    if job.status == DONE:
+        st.markdown(job.report)
+        st.caption(f"💡 *AI-generated report using {job.inputs['model']} model, "
+                   f"{datetime.fromtimestamp(job.finished_at):%Y-%m-%d %H:%M}*")
+    elif job.status == FAILED:
+        st.error(f"❌ Report generation failed: {job.error}")
+        st.caption("Check that Ollama is running; you can generate the report again in a minute.")
+    elif job.status == SUPERSEDED:
+        st.info("ℹ️ This report was replaced by a newer request for the same stock before it started. "
+                "Generate it again to get a report for the current data.")
+    else:
+        label = "Waiting for a free worker..." if job.status == QUEUED else "🤖 AI is writing the report..."
+        st.progress(job.progress, text=label)
 
-Write a clear, informative overview that includes:
-1. What the company does
-2. Its market position
-3. Key business focus areas
-4. Current market context
+def select_symbol(symbol):
+    """
+    Fill the stock input with an autocomplete suggestion
+    """
+    st.session_state.stock_input = symbol
 
-Keep it professional, factual, and exactly 80-120 words. Focus on the company's core business and market position."""
+REPORT_POLL_SECONDS = 2
 
-        # Call Ollama API
-        url = "http://localhost:11434/api/generate"
-        payload = {
-            "model": selected_model,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.3,
-                "top_p": 0.9,
-                "max_tokens": 200
-            }
-        }
-        
-        response = requests.post(url, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            description = result.get('response', '').strip()
-            
-            # Clean up the response
-            if description.startswith('```'):
-                description = description.split('\n', 1)[1] if '\n' in description else description
-            if description.endswith('```'):
-                description = description.rsplit('\n', 1)[0] if '\n' in description else description
-            
-            return description
-        else:
-            return f"**{stock_symbol}** is currently trading in the {sector} sector. Based on current valuation metrics, the stock shows mixed signals relative to sector peers."
-            
-    except Exception as e:
-        # Fallback to static description if LLM fails
-        sector = stock_info.get('sector', 'N/A')
-        return f"**{stock_symbol}** is currently trading in the {sector} sector. Based on current valuation metrics, the stock shows mixed signals relative to sector peers."
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def poll_report_job(job_key):
+    """
+    Re-render a pending report job; once it finishes, rerun the page so polling stops
+    """
+    job = get_report_queue().get(job_key)
+    if job is None or job.finished:
+        st.rerun()
+    render_report_job(job_key)
+
+# Yahoo Finance info keys for the comparison table columns
+INFO_KEYS = {
+    "P/E": "trailingPE",
+    "Forward P/E": "forwardPE",
+    "P/B": "priceToBook",
+    "PEG": "pegRatio",
+    "Analyst Rating": "recommendationMean"
+}
 
 # Page configuration
 st.set_page_config(
@@ -201,13 +175,17 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+symbol_index = get_symbol_index()
+
+# One fetch planner per render so the sidebar can report the heavy .info requests it avoided
+planner = new_fetch_planner()
+
 # Sidebar
 with st.sidebar:
     st.header("🤖 Configuration")
     
     # Model selection
-    model_options = ["llama3.2", "llama3.1", "mistral", "codellama", "qwen2.5"]
-    selected_model = st.selectbox("Select Ollama Model", model_options, index=0)
+    selected_model = st.selectbox("Select Ollama Model", MODEL_OPTIONS, index=0)
     
     # Status indicator
     if check_ollama_status():
@@ -218,6 +196,24 @@ with st.sidebar:
     st.header("📊 Stock Input")
     stock_symbol = st.text_input("Enter stock symbol", placeholder="e.g., AAPL, MSFT", key="stock_input")
     
+    # Validate against the local symbol index before any network call
+    if stock_symbol:
+        stock_symbol = normalize_symbol(stock_symbol)
+        if stock_symbol not in symbol_index:
+            suggestions = symbol_index.complete(stock_symbol, limit=5)
+            # Company names typed into the box can never be valid symbols
+            if symbol_index.covers(stock_symbol) or ' ' in stock_symbol:
+                st.error(f"❌ Unknown symbol '{stock_symbol}'")
+                stock_symbol = None
+            elif is_us_listing_symbol(stock_symbol):
+                st.caption(f"⚠️ '{stock_symbol}' is not in the local symbol index")
+            for match in suggestions:
+                st.button(
+                    f"{match['symbol']} — {match['name'] or match['sector'] or ''}",
+                    key=f"suggest_{match['symbol']}",
+                    on_click=select_symbol, args=(match['symbol'],)
+                )
+    
     # Add sector price checkbox
     add_sector_price = st.checkbox("📊 Add sector price (SPDR ETF)", value=False, help="Include the corresponding SPDR sector ETF in the price chart for comparison")
     
@@ -226,8 +222,7 @@ with st.sidebar:
         
         # Get stock info
         try:
-            stock = yf.Ticker(stock_symbol)
-            info = stock.info
+            info = planner.fetch(stock_symbol, ANALYSIS_FIELDS)
             
             st.subheader("📋 Stock Information")
             st.write(f"**Company:** {info.get('longName', 'N/A')}")
@@ -236,7 +231,7 @@ with st.sidebar:
             
             # Show sector ETF info if checkbox is checked
             if add_sector_price:
-                sector_etf, sector_name = get_sector_etf(stock_symbol)
+                sector_etf, sector_name = get_sector_etf(stock_symbol, planner=planner)
                 if sector_etf:
                     st.write(f"**Sector ETF:** {sector_etf} ({sector_name})")
                 else:
@@ -250,7 +245,11 @@ if stock_symbol:
     try:
         # Get stock data
         stock = yf.Ticker(stock_symbol)
-        info = stock.info
+        info = planner.fetch(stock_symbol, ANALYSIS_FIELDS)
+        
+        # Sector comparison data filled in by the Deep Analysis tab and reused by the AI Report
+        comp_df = pd.DataFrame()
+        sector_weights = None
         
         # Create tabs
         tab1, tab2, tab3 = st.tabs(["📈 Overview", "🧮 Deep Analysis", "🧠 AI Report"])
@@ -306,18 +305,35 @@ if stock_symbol:
             
             # Price chart
             st.subheader("Price Chart")
-            hist = stock.history(period="1y")
+            history_label = st.selectbox("History", list(HISTORY_OPTIONS.keys()), index=0, key="history_range")
+            history_period, history_interval = HISTORY_OPTIONS[history_label]
+            hist = stock.history(period=history_period, interval=history_interval)
+            
+            # For long histories, let the user zoom into a date window; the window is
+            # re-downsampled so it is shown at full resolution once it fits the chart width
+            if len(hist) > DEFAULT_CHART_WIDTH_PX:
+                first_date, last_date = date_bounds(hist)
+                zoom_start, zoom_end = st.slider(
+                    "Zoom range", min_value=first_date, max_value=last_date,
+                    value=(first_date, last_date), key=f"zoom_range_{history_label}",
+                    help="Narrow the window to see the selected period at full resolution"
+                )
+                hist = slice_window(hist, zoom_start, zoom_end)
+            else:
+                zoom_start = zoom_end = None
             
             # Create the base figure with stock price
-            fig = go.Figure(data=[go.Scatter(x=hist.index, y=hist['Close'], mode='lines', name=f'{stock_symbol} Close Price')])
+            fig = go.Figure(data=[line_trace(hist['Close'], f'{stock_symbol} Close Price')])
             
             # Add sector ETF if checkbox is checked
             if add_sector_price:
-                sector_etf, sector_name = get_sector_etf(stock_symbol)
+                sector_etf, sector_name = get_sector_etf(stock_symbol, planner=planner)
                 if sector_etf:
                     try:
                         etf = yf.Ticker(sector_etf)
-                        etf_hist = etf.history(period="1y")
+                        etf_hist = etf.history(period=history_period, interval=history_interval)
+                        if zoom_start is not None:
+                            etf_hist = slice_window(etf_hist, zoom_start, zoom_end)
                         
                         # Normalize ETF price to match stock price scale for better comparison
                         if not etf_hist.empty and not hist.empty:
@@ -325,12 +341,13 @@ if stock_symbol:
                             stock_normalized = (hist['Close'] / hist['Close'].iloc[0]) * 100
                             etf_normalized = (etf_hist['Close'] / etf_hist['Close'].iloc[0]) * 100
                             
+                            # Plot the stock on the same base-100 scale as the ETF
+                            fig = go.Figure(data=[line_trace(stock_normalized, f'{stock_symbol} (Normalized)')])
+                            
                             # Add ETF line to the chart
-                            fig.add_trace(go.Scatter(
-                                x=etf_hist.index, 
-                                y=etf_normalized, 
-                                mode='lines', 
-                                name=f'{sector_etf} (Normalized)', 
+                            fig.add_trace(line_trace(
+                                etf_normalized, 
+                                f'{sector_etf} (Normalized)', 
                                 line=dict(dash='dash', color='orange')
                             ))
                             
@@ -343,15 +360,13 @@ if stock_symbol:
                             )
                         else:
                             # Fallback to regular price chart if normalization fails
-                            fig.add_trace(go.Scatter(
-                                x=etf_hist.index, 
-                                y=etf_hist['Close'], 
-                                mode='lines', 
-                                name=f'{sector_etf} Price', 
+                            fig.add_trace(line_trace(
+                                etf_hist['Close'], 
+                                f'{sector_etf} Price', 
                                 line=dict(dash='dash', color='orange')
                             ))
                             fig.update_layout(
-                                title=f"{stock_symbol} vs {sector_etf} Stock Price (1 Year)",
+                                title=f"{stock_symbol} vs {sector_etf} Stock Price ({history_label})",
                                 xaxis_title="Date", 
                                 yaxis_title="Price ($)",
                                 legend=dict(x=0.02, y=0.98)
@@ -360,21 +375,21 @@ if stock_symbol:
                         st.warning(f"Could not fetch {sector_etf} data: {e}")
                         # Fallback to original chart
                         fig.update_layout(
-                            title=f"{stock_symbol} Stock Price (1 Year)", 
+                            title=f"{stock_symbol} Stock Price ({history_label})", 
                             xaxis_title="Date", 
                             yaxis_title="Price ($)"
                         )
                 else:
                     st.warning("⚠️ Could not determine sector ETF for this stock")
                     fig.update_layout(
-                        title=f"{stock_symbol} Stock Price (1 Year)", 
+                        title=f"{stock_symbol} Stock Price ({history_label})", 
                         xaxis_title="Date", 
                         yaxis_title="Price ($)"
                     )
             else:
                 # Original chart without sector ETF
                 fig.update_layout(
-                    title=f"{stock_symbol} Stock Price (1 Year)", 
+                    title=f"{stock_symbol} Stock Price ({history_label})", 
                     xaxis_title="Date", 
                     yaxis_title="Price ($)"
                 )
@@ -385,19 +400,19 @@ if stock_symbol:
             st.header("🧮 Sector-wide Valuation Comparison")
             
             # Get sector data
-            sector_etf, sector_name = get_sector_etf(stock_symbol)
+            sector_etf, sector_name = get_sector_etf(stock_symbol, planner=planner)
             if sector_etf:
                 try:
-                    # Get sector constituents
-                    constituents = get_sector_constituents(sector_etf)
+                    # Get sector holdings with their ETF weights, largest first
+                    sector_weights = get_sector_holdings(sector_etf)
                     
                     # Get comparative metrics for sector
                     from utils import get_comparative_metrics
-                    comp_df = get_comparative_metrics(constituents[:10])  # Limit to top 10 for performance
+                    comp_df = get_comparative_metrics(sector_weights.index[:10].tolist(), planner=planner)  # Limit to top 10 holdings for performance
                     
                     if not comp_df.empty:
                         st.subheader(f"Sector Comparison: {sector_name}")
-                        st.dataframe(comp_df, use_container_width=True)
+                        st.dataframe(comp_df.join(sector_weights), use_container_width=True)
                         
                         # Create comparison charts
                         col1, col2 = st.columns(2)
@@ -424,47 +439,48 @@ if stock_symbol:
             
             # Valuation analysis
             st.subheader("Valuation Analysis")
-            st.write("Detailed valuation metrics and analysis will appear here...")
+            aggregates = compute_weighted_sector_aggregates(comp_df, sector_weights)
+            if aggregates:
+                agg_cols = st.columns(len(aggregates))
+                for col, (metric, aggregate) in zip(agg_cols, aggregates.items()):
+                    with col:
+                        company_value = info.get(INFO_KEYS[metric])
+                        st.metric(f"Sector {metric}", f"{aggregate['weighted']:.2f}")
+                        if isinstance(company_value, (int, float)):
+                            st.caption(f"{stock_symbol}: {company_value:.2f}")
+                        st.caption(f"{aggregate['basis']}-weighted {aggregate['method']} mean, "
+                                   f"{aggregate['coverage']:.0%} coverage")
+            else:
+                st.write("Weighted sector aggregates are not available for this stock.")
         
         with tab3:
             st.header("🧠 AI Investment Analysis")
             
-            # Simulate AI analysis
-            with st.spinner("AI is analyzing the stock..."):
-                time.sleep(2)  # Simulate processing time
-                
-                st.subheader("Investment Overview")
-                st.write(f"Based on comprehensive analysis of {stock_symbol} against its {info.get('sector', 'Technology')} sector peers, "
-                        f"the stock presents a mixed investment opportunity.")
-                
-                st.subheader("Valuation Metrics")
-                pe_ratio = info.get('trailingPE', 0)
-                if pe_ratio != 0:
-                    st.write(f"The current P/E ratio of {pe_ratio:.1f} suggests the stock is trading at a premium to the sector average of 24.2. "
-                            f"However, this premium may be justified by:")
-                    
-                    st.markdown("""
-                    - Strong revenue growth trajectory
-                    - Market leadership position
-                    - Robust cash flow generation
-                    - Innovation pipeline strength
-                    """)
-                
-                st.subheader("Analysis")
-                pb_ratio = info.get('priceToBook', 0)
-                peg_ratio = info.get('pegRatio', 0)
-                
-                if pb_ratio != 0:
-                    st.write(f"The P/B ratio of {pb_ratio:.1f} indicates significant market confidence in the company's "
-                            f"intangible assets and future growth prospects.")
-                
-                if peg_ratio != 0:
-                    st.write(f"The PEG ratio of {peg_ratio:.1f} suggests growth expectations are factored into current pricing.")
-                
-                st.subheader("Conclusion")
-                st.write(f"While {stock_symbol} appears fairly valued within its sector context, investors should consider "
-                        f"the premium valuation against expected growth delivery. The stock may be suitable for growth-oriented "
-                        f"portfolios but could face pressure if growth expectations are not met.")
+            # Report generation runs in the background job queue; identical inputs reuse the saved report
+            report_inputs = build_report_inputs(
+                stock_symbol, info, selected_model, sector_etf, sector_name, summarize_sector_metrics(comp_df, sector_weights)
+            )
+            report_queue = get_report_queue()
+            report_job = report_queue.lookup(report_inputs)
+            
+            # Only start a job when asked; every tab runs on each rerun, opened or not
+            if report_job is not None and report_job.status == SUPERSEDED:
+                render_report_job(report_job.key)
+                report_job = None
+            if report_job is None:
+                st.write(f"Generate an AI-written analysis of {stock_symbol} against its sector peers "
+                         f"using the {selected_model} model.")
+                if st.button("🧠 Generate report", key="generate_report"):
+                    try:
+                        report_job = report_queue.submit(report_inputs)
+                    except QueueFullError:
+                        st.warning("⚠️ Too many reports are being generated right now. Please try again shortly.")
+            
+            if report_job is not None:
+                if report_job.finished:
+                    render_report_job(report_job.key)
+                else:
+                    poll_report_job(report_job.key)
         
         # Comparative metrics table (floating panel simulation)
         st.sidebar.markdown("---")
@@ -472,15 +488,22 @@ if stock_symbol:
         
         # Create a smaller comparison table in sidebar
         try:
-            sector_etf, sector_name = get_sector_etf(stock_symbol)
+            sector_etf, sector_name = get_sector_etf(stock_symbol, planner=planner)
             if sector_etf:
-                constituents = get_sector_constituents(sector_etf)
-                comp_df = get_comparative_metrics(constituents[:5])  # Show top 5 for sidebar
+                # Reuse the holdings already loaded by the Deep Analysis tab
+                if sector_weights is None:
+                    sector_weights = get_sector_holdings(sector_etf)
+                comp_df = get_comparative_metrics(sector_weights.index[:5].tolist(), planner=planner)  # Show top 5 for sidebar
                 if not comp_df.empty:
                     st.sidebar.dataframe(comp_df[['P/E', 'P/B']], use_container_width=True)
         except:
             pass
         
+        fetch_stats = planner.summary()
+        st.sidebar.caption(f"⚡ {fetch_stats['heavy_avoided']} of "
+                           f"{fetch_stats['heavy_avoided'] + fetch_stats['heavy_requests']} full `.info` requests "
+                           f"avoided this render ({fetch_stats['fast_requests']} `fast_info` lookups)")
+        
     except Exception as e:
         st.error(f"Error analyzing stock {stock_symbol}: {e}")
         st.write("Please check the stock symbol and try again.")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Target on-screen width of the price chart; series are reduced to roughly one point per pixel
+DEFAULT_CHART_WIDTH_PX = 1200
+
+# Above this many raw points a trace is rendered with WebGL (Scattergl) instead of SVG
+WEBGL_POINT_THRESHOLD = 5000
+
+# Selectable history ranges for the Overview chart: label -> (period, interval)
+HISTORY_OPTIONS = {
+    "1 Year (daily)": ("1y", "1d"),
+    "5 Years (daily)": ("5y", "1d"),
+    "Max (daily)": ("max", "1d"),
+    "1 Month (hourly)": ("1mo", "1h"),
+    "5 Days (1-minute)": ("5d", "1m"),
+}
+
+
+def _numeric_x(x):
+    """
+    Convert an x axis (dates or numbers) to float64 for geometric calculations
+    """
+    if isinstance(x, pd.DatetimeIndex):
+        return x.asi8.astype(np.float64)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most `threshold` points that preserve the visual
+    shape of the line (peaks and troughs are kept). First and last points are
+    always included.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = _numeric_x(x)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    # Buckets for the points between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Pick the point in this bucket forming the largest triangle with a and the next average
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return indices
+
+
+def downsample_series(series, max_points=DEFAULT_CHART_WIDTH_PX):
+    """
+    Downsample a pandas Series with LTTB, dropping NaNs first
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    return series.iloc[lttb_indices(series.index, series.values, max_points)]
+
+
+def line_trace(series, name, max_points=DEFAULT_CHART_WIDTH_PX, **kwargs):
+    """
+    Build a line trace for a (possibly very long) Series.
+
+    The series is downsampled to `max_points` so the payload sent to the browser
+    stays constant regardless of history length, and large histories are drawn
+    with Scattergl.
+    """
+    raw_points = int(series.notna().sum())
+    reduced = downsample_series(series, max_points)
+    trace_cls = go.Scattergl if raw_points > WEBGL_POINT_THRESHOLD else go.Scatter
+    return trace_cls(x=reduced.index, y=reduced.values, mode='lines', name=name, **kwargs)
+
+
+def _naive_index(index):
+    return index.tz_localize(None) if getattr(index, "tz", None) is not None else index
+
+
+def date_bounds(df):
+    """
+    First and last timestamps of a DataFrame as naive datetimes (for st.slider)
+    """
+    index = _naive_index(df.index)
+    return index[0].to_pydatetime(), index[-1].to_pydatetime()
+
+
+def slice_window(df, start, end):
+    """
+    Restrict a time-indexed DataFrame to [start, end], ignoring index timezones
+    """
+    index = _naive_index(df.index)
+    return df[(index >= start) & (index <= end)]
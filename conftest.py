@@ -0,0 +1,2 @@
+# test_sector_debug.py is a manual script that calls Yahoo Finance at import time
+collect_ignore = ["test_sector_debug.py"]
@@ -0,0 +1,158 @@
+"""
+Field-level fetch planning for Yahoo Finance data.
+
+Callers ask for the `Ticker.info` fields they need. The planner answers from,
+in order: recently fetched data, locally known data (e.g. sectors of ETF
+holdings), the lightweight `fast_info` endpoint, and only then the heavy
+`.info` request for whatever is left. It counts how many heavy requests were
+made and avoided so the savings can be reported per render.
+"""
+
+import threading
+import time
+
+import yfinance as yf
+
+# Seconds a fetched .info blob or fast_info value is reused
+INFO_TTL_SECONDS = 300
+MAX_CACHE_ENTRIES = 500
+
+# Ticker.info field -> equivalent fast_info key
+FAST_INFO_FIELDS = {
+    "currentPrice": "lastPrice",
+    "marketCap": "marketCap",
+    "previousClose": "previousClose",
+    "open": "open",
+    "dayHigh": "dayHigh",
+    "dayLow": "dayLow",
+    "currency": "currency",
+    "exchange": "exchange",
+    "quoteType": "quoteType",
+    "sharesOutstanding": "shares",
+    "fiftyTwoWeekHigh": "yearHigh",
+    "fiftyTwoWeekLow": "yearLow",
+    "fiftyDayAverage": "fiftyDayAverage",
+    "twoHundredDayAverage": "twoHundredDayAverage",
+}
+
+_cache_lock = threading.Lock()
+_info_cache = {}   # symbol -> (full info dict, fetched_at)
+_fast_cache = {}   # symbol -> (partial field dict, fetched_at)
+
+
+def _cache_get(cache, symbol):
+    with _cache_lock:
+        entry = cache.get(symbol)
+    if entry and time.time() - entry[1] < INFO_TTL_SECONDS:
+        return entry[0]
+    return None
+
+
+def _cache_put(cache, symbol, values):
+    with _cache_lock:
+        cache.pop(symbol, None)
+        cache[symbol] = (values, time.time())
+        while len(cache) > MAX_CACHE_ENTRIES:
+            cache.pop(next(iter(cache)))
+
+
+def clear_cache():
+    with _cache_lock:
+        _info_cache.clear()
+        _fast_cache.clear()
+
+
+class FetchPlanner:
+    """
+    Resolves requested info fields with the cheapest available source.
+    Create one per render (or per API request) to get per-render statistics.
+    """
+
+    def __init__(self, known_fields=None):
+        # known_fields: optional callable(symbol) -> dict of fields known locally
+        self.known_fields = known_fields
+        self.heavy_requests = 0
+        self.heavy_avoided = 0
+        self.fast_requests = 0
+
+    def _from_fast_info(self, symbol, fields):
+        if not fields:
+            return {}
+        cached = _cache_get(_fast_cache, symbol) or {}
+        result = {f: cached[f] for f in fields if f in cached}
+        missing = [f for f in fields if f not in result]
+        if not missing:
+            return result
+
+        try:
+            fast_info = yf.Ticker(symbol).fast_info
+            self.fast_requests += 1
+            fetched = {}
+            for field in missing:
+                try:
+                    value = fast_info[FAST_INFO_FIELDS[field]]
+                except Exception:
+                    continue
+                if value is not None:
+                    fetched[field] = value
+        except Exception as e:
+            print(f"Warning: fast_info unavailable for {symbol}: {str(e)}")
+            return result
+
+        if fetched:
+            _cache_put(_fast_cache, symbol, {**cached, **fetched})
+        result.update(fetched)
+        return result
+
+    def fetch(self, symbol, fields, allow_heavy=True, with_status=False):
+        """
+        Return {field: value} for the requested .info fields.
+
+        Like Ticker.info, fields without a value are left out; so are fields
+        that could not be resolved (the heavy request failed or allow_heavy is
+        False). With with_status=True, returns (result, ok) where ok is False
+        only when a heavy request was made and returned no usable data.
+        """
+        result, ok = self._fetch(symbol, list(dict.fromkeys(fields)), allow_heavy)
+        return (result, ok) if with_status else result
+
+    def _fetch(self, symbol, fields, allow_heavy):
+        cached_info = _cache_get(_info_cache, symbol)
+        if cached_info is not None:
+            self.heavy_avoided += 1
+            return {f: cached_info[f] for f in fields if cached_info.get(f) is not None}, True
+
+        result = {}
+        if self.known_fields:
+            known = self.known_fields(symbol) or {}
+            result.update({f: known[f] for f in fields if known.get(f) is not None})
+
+        # Only use fast_info when it can finish the job; if a heavy request is
+        # unavoidable it returns the fast fields too
+        remaining = [f for f in fields if f not in result]
+        needs_heavy = any(f not in FAST_INFO_FIELDS for f in remaining)
+        if remaining and (not needs_heavy or not allow_heavy):
+            result.update(self._from_fast_info(symbol, [f for f in remaining if f in FAST_INFO_FIELDS]))
+            remaining = [f for f in fields if f not in result]
+
+        if not remaining:
+            self.heavy_avoided += 1
+            return result, True
+        if not allow_heavy:
+            return result, True
+
+        info = yf.Ticker(symbol).info
+        self.heavy_requests += 1
+        if not info or len(info) < 5:  # Basic check for valid response
+            return result, False
+        _cache_put(_info_cache, symbol, info)
+        # Once paid for, Yahoo's values win over local ones so later cache hits agree
+        result.update({f: info[f] for f in fields if info.get(f) is not None})
+        return result, True
+
+    def summary(self):
+        return {
+            "heavy_requests": self.heavy_requests,
+            "heavy_avoided": self.heavy_avoided,
+            "fast_requests": self.fast_requests
+        }
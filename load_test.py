@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Multi-session load test for the Streamlit app.
+
+Drives N simulated analyst sessions through the app.py analysis flow with
+Streamlit's AppTest harness. Yahoo Finance and Ollama are replaced by stubs
+with configurable latency so results are repeatable and comparable between
+runs. Reports throughput, p50/p95/p99 end-to-end render time and peak RSS per
+worker process, and writes a JSON report.
+
+Example:
+    python load_test.py --sessions 20 --concurrency 5 --processes 2 --yahoo-latency 0.2
+    python load_test.py --sessions 20 --compare load_test_reports/load_test_20260101_120000.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+REPORT_DIR = './load_test_reports'
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "NVDA", "JPM", "XOM"]
+
+
+class StubResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = json.dumps(self._payload)
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        # Streaming Ollama responses are newline-delimited JSON
+        yield json.dumps(dict(self._payload, done=True)).encode("utf-8")
+
+
+class StubBackends:
+    """
+    Stand-ins for yfinance.Ticker and the Ollama HTTP API with fixed latency
+    """
+
+    def __init__(self, yahoo_latency, ollama_latency):
+        self.yahoo_latency = yahoo_latency
+        self.ollama_latency = ollama_latency
+        backends = self
+
+        class StubTicker:
+            def __init__(self, symbol, *args, **kwargs):
+                self.ticker = symbol
+                seed = sum(ord(c) for c in symbol)
+                self._info = {
+                    "symbol": symbol,
+                    "longName": f"{symbol} Corporation",
+                    "sector": "Technology",
+                    "industry": "Software",
+                    "currentPrice": 100.0 + seed % 50,
+                    "trailingPE": 15.0 + seed % 20,
+                    "forwardPE": 14.0 + seed % 18,
+                    "priceToBook": 2.0 + seed % 10,
+                    "pegRatio": 1.0 + (seed % 5) / 2,
+                    "marketCap": (seed % 90 + 10) * 1e10,
+                    "recommendationMean": 1.5 + (seed % 3) / 2,
+                    "longBusinessSummary": f"{symbol} makes products."
+                }
+
+            @property
+            def info(self):
+                time.sleep(backends.yahoo_latency)
+                return dict(self._info)
+
+            def get_info(self):
+                return self.info
+
+            @property
+            def fast_info(self):
+                time.sleep(backends.yahoo_latency / 4)
+                return {
+                    "lastPrice": self._info["currentPrice"],
+                    "marketCap": self._info["marketCap"],
+                    "currency": "USD"
+                }
+
+            @property
+            def fund_holdings(self):
+                return None
+
+            @property
+            def funds_data(self):
+                raise AttributeError("funds_data not available in stub")
+
+            def history(self, period="1y", interval="1d", **kwargs):
+                time.sleep(backends.yahoo_latency)
+                index = pd.bdate_range(end="2025-01-01", periods=252, tz="America/New_York")
+                close = 100 + np.cumsum(np.random.default_rng(len(self.ticker)).normal(0, 1, len(index)))
+                return pd.DataFrame({"Close": close}, index=index)
+
+        self.Ticker = StubTicker
+
+    def get(self, url, *args, **kwargs):
+        if ":11434" in url:
+            time.sleep(self.ollama_latency / 10)
+            return StubResponse(200, {"models": []})
+        # Anything else (e.g. listing downloads) behaves as if offline
+        import requests
+        raise requests.ConnectionError(f"Network disabled in load test: {url}")
+
+    def post(self, url, *args, **kwargs):
+        time.sleep(self.ollama_latency)
+        return StubResponse(200, {"response": "Stub analysis generated for load testing."})
+
+    def patches(self, skip_backoff, reports_dir):
+        patches = [
+            mock.patch("yfinance.Ticker", self.Ticker),
+            mock.patch("requests.get", self.get),
+            mock.patch("requests.post", self.post),
+            # Keep stub reports out of the real reports/ directory
+            mock.patch("report_jobs.REPORTS_DIR", reports_dir),
+        ]
+        if skip_backoff:
+            # Collapse the random sleeps used for rate-limit backoff in utils.py
+            patches.append(mock.patch("utils.random.uniform", lambda a, b: 0))
+        return patches
+
+
+def run_session(symbol, timeout, warm_cache=False):
+    """
+    Open the app, enter a symbol, and time the full analysis render
+    """
+    from streamlit.testing.v1 import AppTest
+    import fetch_planner
+    import utils
+
+    # Each simulated analyst starts cold unless cross-session cache reuse is being measured
+    if not warm_cache:
+        fetch_planner.clear_cache()
+        utils.clear_holdings_cache()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    start = time.perf_counter()
+    at.text_input(key="stock_input").set_value(symbol).run()
+    elapsed = time.perf_counter() - start
+    # Uncaught exceptions plus errors the app caught and rendered with st.error
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return elapsed, errors
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in MB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def run_worker(worker_id, symbols, config):
+    """
+    Run a batch of sessions in one process; returns latencies, errors and peak RSS
+    """
+    backends = StubBackends(config["yahoo_latency"], config["ollama_latency"])
+    reports_dir = tempfile.TemporaryDirectory(prefix="load_test_reports_")
+    patches = backends.patches(config["skip_backoff"], reports_dir.name)
+    for p in patches:
+        p.start()
+    try:
+        latencies, errors = [], []
+        with ThreadPoolExecutor(max_workers=config["concurrency"]) as pool:
+            futures = [pool.submit(run_session, s, config["timeout"], config["warm_cache"]) for s in symbols]
+            for future in futures:
+                try:
+                    elapsed, session_errors = future.result()
+                    latencies.append(elapsed)
+                    errors.extend(session_errors)
+                except Exception as e:
+                    errors.append(str(e))
+    finally:
+        for p in patches:
+            p.stop()
+        reports_dir.cleanup()
+    return {
+        "worker": worker_id,
+        "pid": os.getpid(),
+        "sessions": len(symbols),
+        "latencies": latencies,
+        "errors": errors,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def summarize(config, workers, wall_time):
+    latencies = np.array([l for w in workers for l in w["latencies"]])
+    errors = [e for w in workers for e in w["errors"]]
+    summary = {
+        "completed_sessions": int(len(latencies)),
+        "failed_sessions": config["sessions"] - int(len(latencies)),
+        "errors": len(errors),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_sessions_per_s": round(len(latencies) / wall_time, 3) if wall_time > 0 else None,
+        "peak_rss_mb_per_process": {str(w["pid"]): w["peak_rss_mb"] for w in workers},
+        "max_peak_rss_mb": max((w["peak_rss_mb"] for w in workers), default=None)
+    }
+    if len(latencies):
+        for p in (50, 95, 99):
+            summary[f"p{p}_render_s"] = round(float(np.percentile(latencies, p)), 3)
+        summary["mean_render_s"] = round(float(latencies.mean()), 3)
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "summary": summary,
+        "sample_errors": errors[:10]
+    }
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    logger.info(f"Comparison against {baseline_path}:")
+    for key in ("throughput_sessions_per_s", "p50_render_s", "p95_render_s", "p99_render_s", "max_peak_rss_mb"):
+        old, new = baseline["summary"].get(key), report["summary"].get(key)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        logger.info(f"  {key}: {old} -> {new} ({change})")
+    if baseline.get("config") != report["config"]:
+        logger.warning("Baseline was run with a different configuration; numbers may not be comparable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with stubbed Yahoo/Ollama backends")
+    parser.add_argument("--sessions", type=int, default=10, help="Total simulated sessions")
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent sessions per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    parser.add_argument("--symbols", default=",".join(DEFAULT_SYMBOLS), help="Comma-separated symbols, cycled across sessions")
+    parser.add_argument("--yahoo-latency", type=float, default=0.1, help="Seconds per stubbed Yahoo request")
+    parser.add_argument("--ollama-latency", type=float, default=0.5, help="Seconds per stubbed Ollama generation")
+    parser.add_argument("--skip-backoff", action="store_true", help="Disable the random sleeps in utils.py")
+    parser.add_argument("--warm-cache", action="store_true", help="Let sessions reuse each other's cached Yahoo data")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-session script timeout in seconds")
+    parser.add_argument("--output", help="Report path (default: load_test_reports/load_test_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous report to compare against")
+    args = parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    session_symbols = [symbols[i % len(symbols)] for i in range(args.sessions)]
+    processes = max(1, min(args.processes, args.sessions))
+    batches = [session_symbols[i::processes] for i in range(processes)]
+
+    config = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "processes": processes,
+        "symbols": symbols,
+        "yahoo_latency": args.yahoo_latency,
+        "ollama_latency": args.ollama_latency,
+        "skip_backoff": args.skip_backoff,
+        "warm_cache": args.warm_cache,
+        "timeout": args.timeout
+    }
+
+    logger.info(f"Running {args.sessions} sessions across {processes} process(es), {args.concurrency} concurrent each")
+    start = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        workers = pool.starmap(run_worker, [(i, batch, config) for i, batch in enumerate(batches)])
+    wall_time = time.perf_counter() - start
+
+    report = summarize(config, workers, wall_time)
+    for key, value in report["summary"].items():
+        logger.info(f"{key}: {value}")
+
+    output = args.output or os.path.join(REPORT_DIR, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Report written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
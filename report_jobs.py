@@ -0,0 +1,238 @@
+"""
+Background job queue for AI investment reports.
+
+Reports are generated by a worker pool so page rendering never waits on the
+LLM. Each job is keyed by a hash of its inputs (symbol, model, valuation
+ratios and sector statistics); finished reports are persisted to disk together
+with those inputs, so identical inputs are never generated twice, even across
+restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import generate_investment_report
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Cancelled before it started because newer inputs for the same symbol and model arrived
+SUPERSEDED = "superseded"
+
+# Seconds before a failed job may be retried for the same inputs
+RETRY_AFTER_SECONDS = 60
+
+# Jobs waiting for or using a worker; further submissions are refused
+MAX_PENDING_JOBS = 4
+
+# Finished jobs are kept in memory this long (they stay on disk)
+JOB_RETENTION_SECONDS = 3600
+
+# Ratios are rounded to this many decimals so small price moves map to the same report
+RATIO_DECIMALS = 1
+
+REPORT_METRICS = {
+    "P/E": "trailingPE",
+    "Forward P/E": "forwardPE",
+    "P/B": "priceToBook",
+    "PEG": "pegRatio",
+    "Analyst Rating": "recommendationMean"
+}
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def _round_values(value):
+    if isinstance(value, float):
+        return round(value, RATIO_DECIMALS)
+    if isinstance(value, dict):
+        return {k: _round_values(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round_values(v) for v in value]
+    return value
+
+
+def build_report_inputs(symbol, info, model, sector_etf, sector_name, sector_stats):
+    """
+    Collect everything the report depends on into a JSON-serializable dict.
+
+    Only valuation ratios and the sector statistics for those ratios are
+    included; price and market cap move constantly and would defeat dedup.
+    """
+    return _round_values({
+        "symbol": symbol,
+        "company": info.get("longName"),
+        "model": model,
+        "sector_etf": sector_etf,
+        "sector_name": sector_name,
+        "metrics": {name: info.get(key) for name, key in REPORT_METRICS.items()},
+        "sector_stats": {name: s for name, s in (sector_stats or {}).items() if name in REPORT_METRICS}
+    })
+
+
+def report_key(inputs):
+    """
+    Stable hash of the report inputs
+    """
+    canonical = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class ReportJob:
+    def __init__(self, key, inputs):
+        self.key = key
+        self.inputs = inputs
+        self.status = QUEUED
+        self.progress = 0.0
+        self.report = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, SUPERSEDED)
+
+
+class ReportJobQueue:
+    """
+    Deduplicating worker pool for report generation with on-disk persistence
+    """
+
+    def __init__(self, max_workers=2, reports_dir=None, generate=generate_investment_report):
+        self.reports_dir = reports_dir or REPORTS_DIR
+        self._generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        os.makedirs(self.reports_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.reports_dir, f"{key}.json")
+
+    def _load(self, key, inputs):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable report {path}: {str(e)}")
+            return None
+        job = ReportJob(key, inputs)
+        job.status = DONE
+        job.progress = 1.0
+        job.report = saved["report"]
+        job.created_at = saved.get("created_at", job.created_at)
+        job.finished_at = saved.get("finished_at", job.created_at)
+        return job
+
+    def _save(self, job):
+        path = self._path(job.key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "key": job.key,
+                "inputs": job.inputs,
+                "report": job.report,
+                "created_at": job.created_at,
+                "finished_at": job.finished_at
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _run(self, job):
+        job.status = RUNNING
+
+        def on_progress(fraction):
+            job.progress = fraction
+
+        try:
+            job.report = self._generate(job.inputs, progress_callback=on_progress)
+            job.finished_at = time.time()
+            self._save(job)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Report generation failed for {job.inputs.get('symbol')}: {str(e)}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.status = FAILED
+
+    def _prune(self):
+        """
+        Forget finished jobs past their retention period (caller holds the lock)
+        """
+        now = time.time()
+        for key, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > JOB_RETENTION_SECONDS:
+                del self._jobs[key]
+
+    def _existing(self, key, inputs):
+        """
+        In-memory or persisted job for a key, ignoring failures that may be retried (caller holds the lock)
+        """
+        job = self._jobs.get(key)
+        if job is not None and (job.status != FAILED or time.time() - job.finished_at < RETRY_AFTER_SECONDS):
+            return job
+        job = self._load(key, inputs)
+        if job is not None:
+            self._jobs[key] = job
+        return job
+
+    def lookup(self, inputs):
+        """
+        Return the existing job for these inputs without starting generation.
+        A SUPERSEDED job is returned so the caller can explain why it vanished.
+        """
+        with self._lock:
+            self._prune()
+            return self._existing(report_key(inputs), inputs)
+
+    def submit(self, inputs):
+        """
+        Return the job for these inputs, starting generation only if no finished,
+        persisted or in-progress job exists. Failed jobs are retried after
+        RETRY_AFTER_SECONDS. Queued jobs for the same symbol and model are
+        cancelled and kept as SUPERSEDED tombstones, since they may belong to
+        another session. Raises QueueFullError when MAX_PENDING_JOBS jobs are
+        already waiting or running.
+        """
+        key = report_key(inputs)
+        with self._lock:
+            self._prune()
+            job = self._existing(key, inputs)
+            if job is not None and job.status != SUPERSEDED:
+                return job
+
+            for other in self._jobs.values():
+                same_target = (other.inputs.get("symbol"), other.inputs.get("model")) == (inputs.get("symbol"), inputs.get("model"))
+                if same_target and other.status == QUEUED and other.future.cancel():
+                    other.status = SUPERSEDED
+                    other.finished_at = time.time()
+
+            pending = sum(1 for j in self._jobs.values() if not j.finished)
+            if pending >= MAX_PENDING_JOBS:
+                raise QueueFullError(f"{pending} reports are already being generated")
+
+            job = ReportJob(key, inputs)
+            job.future = self._executor.submit(self._run, job)
+            self._jobs[key] = job
+            return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
@@ -34,11 +34,16 @@ for i, ticker in enumerate(etfs, 1):
         h = fund.funds_data.top_holdings
         
         if h is not None and not h.empty:
-            # Extract symbols from the index (which contains the ticker symbols)
-            symbols = h.index.tolist()
-            all_holdings[ticker] = sorted(symbols)
-            logger.info(f"✅ Successfully fetched {len(symbols)} holdings for {ticker}")
-            logger.debug(f"Sample holdings for {ticker}: {symbols[:5]}...")
+            # The index contains the ticker symbols; keep names and portfolio weights (fractions of the fund)
+            h = h.sort_values('Holding Percent', ascending=False)
+            holdings = [
+                {"symbol": symbol, "name": row.get('Name'), "weight": float(row['Holding Percent'])}
+                for symbol, row in h.iterrows()
+            ]
+            all_holdings[ticker] = holdings
+            logger.info(f"✅ Successfully fetched {len(holdings)} holdings for {ticker} "
+                        f"({sum(x['weight'] for x in holdings):.1%} of fund)")
+            logger.debug(f"Sample holdings for {ticker}: {holdings[:5]}...")
         else:
             logger.warning(f"❗ No holdings data available for {ticker}")
     except Exception as e:
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Local ticker-universe index for instant symbol validation and autocomplete.
+
+The index is built from:
+  - ticker_symbols/sector_etf_holdings.json (written by script_get_symbols.py)
+  - SECTOR_CONSTITUENTS_DATA and the SPDR sector ETFs in utils.py
+  - ticker_symbols/listed_symbols.txt, the Nasdaq Trader listing of all US-traded
+    securities (downloaded on first use, or by running this script)
+
+Tickers and company-name words are stored in prefix tries so validation and
+autocomplete never touch the network.
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+
+import requests
+
+from utils import SECTOR_CONSTITUENTS_DATA, HOLDINGS_FILE, spdr_map
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.dirname(HOLDINGS_FILE)
+LISTING_FILE = os.path.join(DATA_DIR, 'listed_symbols.txt')
+LISTING_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt'
+
+# Listing symbols may contain '$' (preferred shares such as BAC$K), so the
+# end-of-key marker must be something no string key can contain
+_END = object()
+
+
+# Share classes are written BRK.B on US listings and BRK-B on Yahoo
+_SHARE_CLASS = re.compile(r'^([A-Z]+)\.([A-Z])$')
+
+# Symbols in the form used by US listings; anything else (SHOP.TO, BMW.DE,
+# 0700.HK, ^GSPC, BTC-USD, EURUSD=X) is outside the listing file's universe
+_US_LISTING_SYMBOL = re.compile(r'^[A-Z]+(-[A-Z])?$')
+
+
+def normalize_symbol(symbol):
+    """
+    Upper-case a symbol and use Yahoo's share-class separator (BRK.B -> BRK-B),
+    leaving exchange suffixes such as SHOP.TO untouched
+    """
+    return _SHARE_CLASS.sub(r'\1-\2', symbol.strip().upper())
+
+
+def is_us_listing_symbol(symbol):
+    """
+    True if the symbol has the shape of a US-listed ticker the listing file can vouch for
+    """
+    return bool(_US_LISTING_SYMBOL.match(normalize_symbol(symbol)))
+
+
+class _Trie:
+    """
+    Prefix tree mapping string keys to sets of symbols
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, symbol):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(_END, set()).add(symbol)
+
+    def search_prefix(self, prefix, limit):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+
+        # Breadth-first so shorter (closer) completions come first
+        results, queue = [], [node]
+        while queue and len(results) < limit:
+            next_queue = []
+            for current in queue:
+                for symbol in sorted(current.get(_END, ())):
+                    if symbol not in results:
+                        results.append(symbol)
+                for ch in sorted(k for k in current if k is not _END):
+                    next_queue.append(current[ch])
+            queue = next_queue
+        return results[:limit]
+
+
+class SymbolIndex:
+    """
+    In-memory index of known tickers with names and sectors
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.has_listing = False
+        self._tickers = _Trie()
+        self._names = _Trie()
+
+    def __contains__(self, symbol):
+        return normalize_symbol(symbol) in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, symbol, name=None, sector=None):
+        symbol = normalize_symbol(symbol)
+        if not symbol:
+            return
+        record = self.records.get(symbol)
+        if record is None:
+            record = self.records[symbol] = {"symbol": symbol, "name": None, "sector": None}
+            self._tickers.insert(symbol, symbol)
+        if name and not record["name"]:
+            record["name"] = name
+            for word in name.upper().split():
+                self._names.insert(word, symbol)
+        if sector and not record["sector"]:
+            record["sector"] = sector
+
+    def get(self, symbol):
+        return self.records.get(normalize_symbol(symbol))
+
+    def covers(self, symbol):
+        """
+        True if an unknown symbol can be ruled out: the full US listing is loaded
+        and the symbol is not exchange-suffixed or otherwise non-US
+        """
+        return self.has_listing and is_us_listing_symbol(symbol)
+
+    def is_valid(self, symbol):
+        """
+        True if the symbol is known, or if the index cannot rule it out
+        """
+        return symbol in self or not self.covers(symbol)
+
+    def complete(self, text, limit=10):
+        """
+        Autocomplete by ticker prefix first, then by company-name word prefix
+        """
+        text = text.strip().upper()
+        if not text:
+            return []
+        symbols = self._tickers.search_prefix(normalize_symbol(text), limit)
+        if len(symbols) < limit:
+            words = text.split()
+            name_matches = self._names.search_prefix(words[0], limit * 5)
+            for word in words[1:]:
+                matches = set(self._names.search_prefix(word, limit * 50))
+                name_matches = [s for s in name_matches if s in matches]
+            symbols += [s for s in name_matches if s not in symbols]
+        return [self.records[s] for s in symbols[:limit]]
+
+
+def download_listing(path=LISTING_FILE, url=LISTING_URL, timeout=10):
+    """
+    Download the Nasdaq Trader listing of US-traded securities
+    """
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(response.text)
+    return path
+
+
+def _load_listing(index, path):
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f, delimiter='|')
+        for row in reader:
+            symbol = row.get('Symbol') or row.get('ACT Symbol')
+            if not symbol or symbol.startswith('File Creation Time'):
+                continue
+            if row.get('Test Issue') == 'Y':
+                continue
+            index.add(symbol, name=row.get('Security Name'))
+
+
+def _load_holdings(index, path):
+    with open(path) as f:
+        holdings = json.load(f)
+    for etf, entries in holdings.items():
+        sector = spdr_map.get(etf)
+        for entry in entries:
+            if isinstance(entry, dict):
+                index.add(entry.get('symbol', ''), name=entry.get('name'), sector=sector)
+            else:
+                index.add(entry, sector=sector)
+
+
+def load_symbol_index(download=True):
+    """
+    Build the symbol index from local data, downloading the listing file once if missing
+    """
+    index = SymbolIndex()
+
+    for etf, sector in spdr_map.items():
+        index.add(etf, name=f"{sector} Select Sector SPDR Fund", sector=sector)
+    for etf, symbols in SECTOR_CONSTITUENTS_DATA.items():
+        for symbol in symbols:
+            index.add(symbol, sector=spdr_map[etf])
+
+    if os.path.exists(HOLDINGS_FILE):
+        try:
+            _load_holdings(index, HOLDINGS_FILE)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read holdings file {HOLDINGS_FILE}: {str(e)}")
+
+    if not os.path.exists(LISTING_FILE) and download:
+        try:
+            download_listing()
+        except Exception as e:
+            logger.warning(f"Could not download symbol listing: {str(e)}")
+
+    if os.path.exists(LISTING_FILE):
+        try:
+            _load_listing(index, LISTING_FILE)
+            index.has_listing = True
+        except (OSError, csv.Error) as e:
+            logger.warning(f"Could not read symbol listing {LISTING_FILE}: {str(e)}")
+
+    return index
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.info(f"Downloading symbol listing from {LISTING_URL}")
+    download_listing()
+    index = load_symbol_index(download=False)
+    logger.info(f"Indexed {len(index)} symbols into {LISTING_FILE}")
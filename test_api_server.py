@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from api_server import AnalysisService, make_handler, DEFAULT_MODEL
+from http.server import ThreadingHTTPServer
+from symbol_index import SymbolIndex
+
+
+class SlowAnalyzer:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, model):
+        with self._lock:
+            self.calls.append((symbol, model))
+        time.sleep(self.delay)
+        return {"symbol": symbol, "model": model}
+
+
+def test_concurrent_requests_are_coalesced():
+    analyzer = SlowAnalyzer()
+    service = AnalysisService(analyze=analyzer)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get("aapl"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert analyzer.calls == [("AAPL", DEFAULT_MODEL)]
+    assert all(r[0] == {"symbol": "AAPL", "model": DEFAULT_MODEL} for r in results)
+
+    result, _, cache_hit = service.get("AAPL")
+    assert cache_hit and len(analyzer.calls) == 1
+
+
+def test_expired_entries_are_evicted_on_write():
+    service = AnalysisService(ttl_seconds=60, analyze=SlowAnalyzer(delay=0))
+    service.get("AAPL")
+    key = ("AAPL", DEFAULT_MODEL)
+    service._cache[key] = (service._cache[key][0], time.time() - 120)
+
+    service.get("MSFT")
+    assert key not in service._cache
+    assert ("MSFT", DEFAULT_MODEL) in service._cache
+
+
+@pytest.fixture
+def api_url():
+    service = AnalysisService(analyze=SlowAnalyzer(delay=0))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service, SymbolIndex()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("body", [
+    ["AAPL"],
+    {"symbols": "AAPL"},
+    {"symbols": ["AAPL"], "model": ["llama3.2"]},
+    {"symbols": ["AAPL"], "model": "not-a-model"},
+])
+def test_bulk_rejects_malformed_bodies(api_url, body):
+    response = requests.post(f"{api_url}/analysis/bulk", data=json.dumps(body))
+    assert response.status_code == 400
+
+
+def test_bulk_and_single_requests(api_url):
+    response = requests.post(f"{api_url}/analysis/bulk", data=json.dumps({"symbols": ["aapl", "brk.b"]}))
+    assert response.status_code == 200
+    assert sorted(response.json()["results"]) == ["AAPL", "BRK-B"]
+
+    assert requests.get(f"{api_url}/analysis/MSFT?model=mistral").status_code == 200
+    assert requests.get(f"{api_url}/analysis/MSFT?model=gpt-4").status_code == 400
+
+
+def test_path_symbols_are_url_decoded(api_url):
+    response = requests.get(f"{api_url}/analysis/%5EGSPC")
+    assert response.status_code == 200
+    assert response.json()["symbol"] == "^GSPC"
+
+    assert requests.get(f"{api_url}/analysis/EURUSD%3DX").json()["symbol"] == "EURUSD=X"
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from chart_utils import lttb_indices, downsample_series, line_trace, slice_window, WEBGL_POINT_THRESHOLD
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    indices = lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(1000)
+    y[537] = 50.0
+    y[811] = -50.0
+    indices = lttb_indices(np.arange(1000), y, 50)
+    assert 537 in indices and 811 in indices
+
+
+def test_lttb_bucket_edges_for_small_thresholds():
+    # Every bucket must be non-empty even when the threshold is close to n
+    for n, threshold in [(10, 9), (10, 3), (4, 3), (1001, 1000)]:
+        indices = lttb_indices(np.arange(n), np.random.default_rng(n).normal(size=n), threshold)
+        assert len(indices) == threshold == len(set(indices.tolist()))
+
+
+def test_short_series_pass_through():
+    assert len(lttb_indices(np.arange(5), np.arange(5), 10)) == 5
+    assert len(lttb_indices(np.arange(5), np.arange(5), 2)) == 5
+
+    series = pd.Series([1.0, np.nan, 3.0], index=pd.date_range("2024-01-01", periods=3))
+    assert downsample_series(series).tolist() == [1.0, 3.0]
+
+
+def test_line_trace_downsamples_and_switches_to_webgl():
+    index = pd.date_range("2020-01-01", periods=WEBGL_POINT_THRESHOLD + 1, freq="min")
+    series = pd.Series(np.arange(len(index), dtype=float), index=index)
+
+    trace = line_trace(series, "Close", max_points=500)
+    assert isinstance(trace, go.Scattergl)
+    assert len(trace.x) == 500 and trace.y[-1] == series.iloc[-1]
+
+    assert isinstance(line_trace(series.iloc[:100], "Close"), go.Scatter)
+
+
+def test_slice_window_ignores_timezone():
+    df = pd.DataFrame({"Close": range(5)}, index=pd.date_range("2024-01-01", periods=5, tz="America/New_York"))
+    sliced = slice_window(df, pd.Timestamp("2024-01-02").to_pydatetime(), pd.Timestamp("2024-01-04").to_pydatetime())
+    assert sliced["Close"].tolist() == [1, 2, 3]
@@ -0,0 +1,84 @@
+import pytest
+
+import fetch_planner
+from fetch_planner import FetchPlanner
+
+
+INFO = {
+    "symbol": "AMZN", "sector": "Consumer Cyclical", "longName": "Amazon.com, Inc.",
+    "currentPrice": 180.0, "marketCap": 1.9e12, "trailingPE": 50.0, "priceToBook": 8.0
+}
+
+
+class FakeTicker:
+    calls = []
+    info_blob = INFO
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        FakeTicker.calls.append(("info", self.symbol))
+        return dict(FakeTicker.info_blob)
+
+    @property
+    def fast_info(self):
+        FakeTicker.calls.append(("fast_info", self.symbol))
+        return {"lastPrice": 181.0, "marketCap": 1.8e12}
+
+
+@pytest.fixture(autouse=True)
+def fake_yahoo(monkeypatch):
+    FakeTicker.calls = []
+    FakeTicker.info_blob = INFO
+    monkeypatch.setattr(fetch_planner.yf, "Ticker", FakeTicker)
+    fetch_planner.clear_cache()
+    yield
+    fetch_planner.clear_cache()
+
+
+def known_sector(symbol):
+    return {"sector": "Consumer Discretionary"} if symbol == "AMZN" else {}
+
+
+def test_known_fields_avoid_any_request():
+    planner = FetchPlanner(known_fields=known_sector)
+    assert planner.fetch("AMZN", ["sector"]) == {"sector": "Consumer Discretionary"}
+    assert FakeTicker.calls == []
+    assert planner.summary()["heavy_avoided"] == 1
+
+
+def test_fast_info_used_when_it_covers_all_fields():
+    planner = FetchPlanner()
+    assert planner.fetch("AMZN", ["currentPrice", "marketCap"]) == {"currentPrice": 181.0, "marketCap": 1.8e12}
+    assert FakeTicker.calls == [("fast_info", "AMZN")]
+    assert planner.summary() == {"heavy_requests": 0, "heavy_avoided": 1, "fast_requests": 1}
+
+
+def test_heavy_request_skips_fast_info_and_overrides_known_values():
+    planner = FetchPlanner(known_fields=known_sector)
+    result = planner.fetch("AMZN", ["sector", "currentPrice", "trailingPE"])
+    assert FakeTicker.calls == [("info", "AMZN")]
+    assert result == {"sector": "Consumer Cyclical", "currentPrice": 180.0, "trailingPE": 50.0}
+
+    # Cache hits return the same values as the render that paid for the request
+    assert planner.fetch("AMZN", ["sector"]) == {"sector": "Consumer Cyclical"}
+    assert planner.summary()["heavy_requests"] == 1
+
+
+def test_allow_heavy_false_never_calls_info():
+    planner = FetchPlanner()
+    assert planner.fetch("AMZN", ["trailingPE"], allow_heavy=False) == {}
+    assert ("info", "AMZN") not in FakeTicker.calls
+
+
+def test_status_distinguishes_failure_from_missing_fields():
+    planner = FetchPlanner()
+    result, ok = planner.fetch("AMZN", ["pegRatio"], with_status=True)
+    assert ok and result == {}
+
+    fetch_planner.clear_cache()
+    FakeTicker.info_blob = {"symbol": "AMZN"}
+    result, ok = planner.fetch("AMZN", ["pegRatio"], with_status=True)
+    assert not ok
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+import report_jobs
+from report_jobs import ReportJobQueue, QueueFullError, build_report_inputs, report_key, DONE, FAILED, SUPERSEDED
+
+
+INFO = {"longName": "Apple Inc.", "trailingPE": 30.04, "forwardPE": 27.0, "priceToBook": 45.2,
+        "pegRatio": 2.1, "recommendationMean": 1.9, "currentPrice": 190.12, "marketCap": 2.9e12}
+SECTOR_STATS = {"P/E": {"median": 28.0, "mean": 30.0, "count": 10}, "Market Cap": {"median": 1e12, "mean": 1e12, "count": 10}}
+
+
+def make_inputs(info=INFO, symbol="AAPL", model="llama3.2"):
+    return build_report_inputs(symbol, info, model, "XLK", "Technology", SECTOR_STATS)
+
+
+def test_inputs_ignore_price_and_market_cap():
+    inputs = make_inputs()
+    moved = make_inputs(dict(INFO, currentPrice=191.5, marketCap=2.95e12, trailingPE=30.01))
+    assert "Current Price" not in inputs["metrics"] and "Market Cap" not in inputs["metrics"]
+    assert "Market Cap" not in inputs["sector_stats"]
+    assert report_key(inputs) == report_key(moved)
+
+
+def test_identical_inputs_generate_once_and_persist(tmp_path):
+    calls = []
+
+    def generate(inputs, progress_callback=None):
+        calls.append(inputs["symbol"])
+        return "report"
+
+    queue = ReportJobQueue(reports_dir=str(tmp_path), generate=generate)
+    inputs = make_inputs()
+    assert queue.lookup(inputs) is None
+    job = queue.submit(inputs)
+    job.future.result()
+    assert queue.submit(inputs) is job
+    assert job.status == DONE
+
+    # A fresh queue (e.g. after a restart) serves the saved report
+    restarted = ReportJobQueue(reports_dir=str(tmp_path), generate=generate)
+    assert restarted.lookup(inputs).report == "report"
+    assert calls == ["AAPL"]
+
+
+def test_failed_job_is_not_retried_immediately(tmp_path):
+    def generate(inputs, progress_callback=None):
+        raise RuntimeError("ollama down")
+
+    queue = ReportJobQueue(reports_dir=str(tmp_path), generate=generate)
+    job = queue.submit(make_inputs())
+    job.future.result()
+    assert job.status == FAILED
+    assert queue.submit(make_inputs()) is job
+
+
+def test_queue_limit_and_superseded_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_jobs, "MAX_PENDING_JOBS", 2)
+    release = threading.Event()
+
+    def generate(inputs, progress_callback=None):
+        release.wait(5)
+        return "report"
+
+    queue = ReportJobQueue(max_workers=1, reports_dir=str(tmp_path), generate=generate)
+    running = queue.submit(make_inputs(symbol="MSFT"))
+    queued = queue.submit(make_inputs())
+
+    # New inputs for the same symbol and model replace the queued job
+    newer = queue.submit(make_inputs(dict(INFO, trailingPE=35.0)))
+    assert queued.future.cancelled()
+    # The replaced job stays visible to the session that submitted it
+    assert queue.get(queued.key).status == SUPERSEDED
+    assert queue.lookup(make_inputs()) is queued
+    assert queue.lookup(make_inputs(dict(INFO, trailingPE=35.0))) is newer
+
+    with pytest.raises(QueueFullError):
+        queue.submit(make_inputs(symbol="NVDA"))
+
+    release.set()
+    running.future.result()
+    newer.future.result()
+
+
+def test_superseded_job_can_be_generated_again(tmp_path):
+    release = threading.Event()
+
+    def generate(inputs, progress_callback=None):
+        release.wait(5)
+        return f"report {inputs['metrics']['P/E']}"
+
+    queue = ReportJobQueue(max_workers=1, reports_dir=str(tmp_path), generate=generate)
+    running = queue.submit(make_inputs(symbol="MSFT"))
+    first = queue.submit(make_inputs())
+    queue.submit(make_inputs(dict(INFO, trailingPE=35.0)))
+    assert first.status == SUPERSEDED and first.finished
+
+    release.set()
+    running.future.result()
+    again = queue.submit(make_inputs())
+    assert again is not first
+    again.future.result()
+    assert again.status == DONE and again.report == "report 30.0"
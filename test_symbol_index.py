@@ -0,0 +1,74 @@
+import symbol_index
+from symbol_index import SymbolIndex, normalize_symbol, is_us_listing_symbol, load_symbol_index
+
+
+LISTING = """Nasdaq Traded|Symbol|Security Name|Listing Exchange|Market Category|ETF|Round Lot Size|Test Issue|Financial Status|CQS Symbol|NASDAQ Symbol|NextShares
+Y|AAPL|Apple Inc. - Common Stock|Q|Q|N|100|N|N||AAPL|N
+Y|BAC|Bank of America Corporation Common Stock|N| |N|100|N||BAC|BAC|N
+Y|BRK.B|Berkshire Hathaway Inc. New Common Stock|N| |N|100|N||BRK.B|BRK.B|N
+Y|ACP|Aberdeen Income Credit Strategies Fund|N| |N|100|N||ACP|ACP|N
+Y|ACP$A|Aberdeen Income Credit Strategies Fund 5.250% Series A Preferred|N| |N|100|N||ACP$A|ACP$A|N
+Y|ZZZT|Test Co|Q|Q|N|100|Y|N||ZZZT|N
+File Creation Time: 1019202600:00|||||||||||
+"""
+
+
+def test_normalize_symbol_rewrites_only_share_classes():
+    assert normalize_symbol(" brk.b ") == "BRK-B"
+    assert normalize_symbol("SHOP.TO") == "SHOP.TO"
+    assert normalize_symbol("bmw.de") == "BMW.DE"
+    assert normalize_symbol("0700.HK") == "0700.HK"
+
+
+def test_us_listing_symbol_shape():
+    assert is_us_listing_symbol("AAPL")
+    assert is_us_listing_symbol("BRK.B")
+    for symbol in ("SHOP.TO", "BMW.DE", "^GSPC", "BTC-USD", "EURUSD=X"):
+        assert not is_us_listing_symbol(symbol)
+
+
+def test_complete_prefers_shorter_ticker_matches_then_names():
+    index = SymbolIndex()
+    for symbol in ("AAPL", "AA", "AAP", "AAON"):
+        index.add(symbol)
+    index.add("MSFT", name="Microsoft Corporation")
+    index.add("BAC", name="Bank of America Corporation")
+
+    assert [r["symbol"] for r in index.complete("aa", limit=3)] == ["AA", "AAP", "AAON"]
+    assert [r["symbol"] for r in index.complete("micro")] == ["MSFT"]
+    assert [r["symbol"] for r in index.complete("bank of am")] == ["BAC"]
+    assert [r["symbol"] for r in index.complete("corporation of")] == ["BAC"]
+    assert index.complete("   ") == []
+
+
+def test_listing_drives_validation(tmp_path, monkeypatch):
+    listing = tmp_path / "listed_symbols.txt"
+    listing.write_text(LISTING)
+    monkeypatch.setattr(symbol_index, "LISTING_FILE", str(listing))
+    monkeypatch.setattr(symbol_index, "HOLDINGS_FILE", str(tmp_path / "missing.json"))
+
+    index = load_symbol_index(download=False)
+    assert index.has_listing
+    assert "BRK.B" in index and index.get("brk.b")["sector"] == "Financials"
+    assert "ZZZT" not in index
+    assert "ACP" in index and "ACP$A" in index
+    assert [r["symbol"] for r in index.complete("ACP")] == ["ACP", "ACP$A"]
+    assert not index.is_valid("AAPLX")
+    # Non-US symbols are outside the listing and must not be rejected
+    assert index.is_valid("SHOP.TO") and index.is_valid("BMW.DE")
+
+
+def test_without_listing_nothing_is_ruled_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_index, "LISTING_FILE", str(tmp_path / "missing.txt"))
+    index = load_symbol_index(download=False)
+    assert not index.has_listing
+    assert index.is_valid("AAPLX")
+
+
+def test_dollar_sign_symbols_in_either_order():
+    for symbols in (["X", "X$A"], ["X$A", "X"]):
+        index = SymbolIndex()
+        for symbol in symbols:
+            index.add(symbol)
+        assert "X" in index and "X$A" in index
+        assert [r["symbol"] for r in index.complete("X")] == ["X", "X$A"]
@@ -0,0 +1,87 @@
+import pandas as pd
+
+import fetch_planner
+import utils
+from fetch_planner import FetchPlanner
+
+
+class NoRatiosTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        return {"symbol": self.symbol, "longName": "Example", "sector": "Technology",
+                "industry": "Software", "marketCap": 1e9}
+
+
+def test_comparative_metrics_keep_valid_rows_without_ratios(monkeypatch):
+    monkeypatch.setattr(fetch_planner.yf, "Ticker", NoRatiosTicker)
+    monkeypatch.setattr(utils.time, "sleep", lambda s: (_ for _ in ()).throw(AssertionError("retried")))
+    fetch_planner.clear_cache()
+
+    df = utils.get_comparative_metrics(["AAA"], planner=FetchPlanner())
+    fetch_planner.clear_cache()
+
+    assert df.index.tolist() == ["AAA"]
+    assert df.loc["AAA", "Market Cap"] == 1e9
+    assert pd.isna(df.loc["AAA", "P/E"])
+
+
+def test_weighted_harmonic_mean_and_coverage():
+    comp_df = pd.DataFrame({"P/E": [10.0, 40.0, None], "PEG": [1.0, 2.0, 3.0]}, index=["A", "B", "C"])
+    weights = pd.Series({"A": 0.2, "B": 0.1, "C": 0.05})
+
+    result = utils.compute_weighted_sector_aggregates(comp_df, weights)
+
+    assert result["P/E"] == {"weighted": 13.33, "coverage": 0.3, "method": "harmonic", "basis": "ETF weight"}
+    assert result["PEG"]["weighted"] == round((0.2 * 1 + 0.1 * 2 + 0.05 * 3) / 0.35, 2)
+    assert result["PEG"]["coverage"] == 0.35
+
+
+def test_weighted_aggregates_fall_back_to_market_cap():
+    comp_df = pd.DataFrame({"P/E": [20.0, 30.0], "Market Cap": [1e9, 3e9]}, index=["A", "B"])
+
+    result = utils.compute_weighted_sector_aggregates(comp_df)
+
+    assert result["P/E"]["basis"] == "market cap"
+    assert result["P/E"]["weighted"] == 26.67
+    assert result["P/E"]["coverage"] == 1.0
+
+
+def test_sector_summary_coerces_mixed_type_columns():
+    comp_df = pd.DataFrame({"P/E": [10.0, "Infinity", 30.0], "Market Cap": [1e9, 2e9, 3e9]}, index=["A", "B", "C"])
+
+    stats = utils.summarize_sector_metrics(comp_df)
+
+    assert stats["P/E"]["median"] == 20.0 and stats["P/E"]["count"] == 2
+    assert "weighted" in stats["P/E"]
+
+
+class FundsTicker:
+    calls = 0
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def funds_data(self):
+        FundsTicker.calls += 1
+        top = pd.DataFrame({"Holding Percent": [0.2, 0.1]}, index=pd.Index(["AAA", "BBB"], name="Symbol"))
+        return type("FundsData", (), {"top_holdings": top})()
+
+
+def test_live_holdings_are_cached_per_etf(monkeypatch):
+    FundsTicker.calls = 0
+    monkeypatch.setattr(utils.yf, "Ticker", FundsTicker)
+    monkeypatch.setattr(utils, "_load_holdings_file", lambda etf: None)
+    utils.clear_holdings_cache()
+
+    first = utils.get_sector_holdings("XLK")
+    second = utils.get_sector_holdings("XLK")
+    utils.get_sector_holdings("XLF")
+    utils.clear_holdings_cache()
+
+    assert FundsTicker.calls == 2
+    assert first.index.tolist() == second.index.tolist() == ["AAA", "BBB"]
+    assert second.name == "Weight" and second.index.name == "Ticker"
@@ -1,7 +1,17 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
+import os
 import time
 import random
+import threading
+from functools import lru_cache
+import requests
+import json
+from fetch_planner import FetchPlanner
+
+# Holdings with weights, written by script_get_symbols.py
+HOLDINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ticker_symbols', 'sector_etf_holdings.json')
 
 spdr_map = {
     "XLY": "Consumer Discretionary", "XLP": "Consumer Staples", "XLE": "Energy",
@@ -24,10 +34,81 @@ SECTOR_CONSTITUENTS_DATA = {
     "XLC": ["CHTR", "DIS", "EA", "GOOG", "GOOGL", "LYV", "META", "NFLX", "T", "TTWO"]
 }
 
-def get_sector_etf(symbol, max_retries=3):
+# Yahoo Finance sector names that differ from the SPDR sector names
+SECTOR_VARIATIONS = {
+    "technology": "XLK",
+    "tech": "XLK",
+    "consumer discretionary": "XLY",
+    "consumer cyclical": "XLY",  # Yahoo Finance uses "Consumer Cyclical"
+    "consumer staples": "XLP",
+    "consumer defensive": "XLP",  # Yahoo Finance uses "Consumer Defensive"
+    "energy": "XLE",
+    "financials": "XLF",
+    "financial services": "XLF",
+    "health care": "XLV",
+    "healthcare": "XLV",
+    "industrials": "XLI",
+    "materials": "XLB",
+    "utilities": "XLU",
+    "real estate": "XLRE",
+    "communication services": "XLC",
+    "communications": "XLC"
+}
+
+def map_sector_to_etf(sector):
+    """
+    Map a sector name to its SPDR ETF, returning (etf, name) or (None, None)
+    """
+    # Try exact match first
+    for etf, name in spdr_map.items():
+        if sector.lower() == name.lower():
+            return etf, name
+    
+    # Try partial match
+    for etf, name in spdr_map.items():
+        if sector.lower() in name.lower() or name.lower() in sector.lower():
+            return etf, name
+    
+    # Try common sector name variations
+    sector_lower = sector.lower()
+    if sector_lower in SECTOR_VARIATIONS:
+        etf = SECTOR_VARIATIONS[sector_lower]
+        return etf, spdr_map[etf]
+    
+    return None, None
+
+def get_known_fields(symbol):
+    """
+    Info fields known without a network call: the sector of any SPDR ETF holding
+    """
+    for etf, symbols in SECTOR_CONSTITUENTS_DATA.items():
+        if symbol in symbols:
+            return {"sector": spdr_map[etf]}
+    for etf, entries in _read_holdings_json(HOLDINGS_FILE).items():
+        for entry in entries:
+            if (entry.get("symbol") if isinstance(entry, dict) else entry) == symbol:
+                return {"sector": spdr_map.get(etf)}
+    return {}
+
+def new_fetch_planner():
+    """
+    Create a FetchPlanner that also uses locally known sectors
+    """
+    return FetchPlanner(known_fields=get_known_fields)
+
+def get_sector_etf(symbol, max_retries=3, planner=None):
     """
     Get sector ETF for a stock symbol with retry logic for rate limiting
     """
+    planner = planner or new_fetch_planner()
+    
+    # Local holdings data or a recently fetched .info answers most lookups without any request or delay
+    sector = planner.fetch(symbol, ["sector"], allow_heavy=False).get("sector")
+    if sector:
+        etf, name = map_sector_to_etf(sector)
+        if etf:
+            return etf, name
+    
     for attempt in range(max_retries):
         try:
             # Add longer random delay to avoid rate limiting
@@ -36,75 +117,15 @@ def get_sector_etf(symbol, max_retries=3):
             else:
                 time.sleep(random.uniform(1, 2))  # Initial delay
             
-            ticker = yf.Ticker(symbol)
-            
-            # Try multiple methods to get sector information
-            sector = None
-            
-            # Method 1: Try info attribute
-            try:
-                info = ticker.info
-                sector = info.get("sector", "")
-            except:
-                pass
-            
-            # Method 2: Try fast_info if available
-            if not sector:
-                try:
-                    fast_info = ticker.fast_info
-                    sector = getattr(fast_info, 'sector', '')
-                except:
-                    pass
-            
-            # Method 3: Try getting basic info
-            if not sector:
-                try:
-                    # Try a more basic approach
-                    basic_info = ticker.get_info()
-                    sector = basic_info.get("sector", "")
-                except:
-                    pass
+            sector = planner.fetch(symbol, ["sector"]).get("sector")
             
             # Check if we got valid sector information
             if not sector:
                 print(f"Warning: No sector found for {symbol} on attempt {attempt + 1}")
                 continue
-                
-            # Try exact match first
-            for etf, name in spdr_map.items():
-                if sector.lower() == name.lower():
-                    return etf, name
-            
-            # Try partial match
-            for etf, name in spdr_map.items():
-                if sector.lower() in name.lower() or name.lower() in sector.lower():
-                    return etf, name
             
-            # Try common sector name variations
-            sector_variations = {
-                "technology": "XLK",
-                "tech": "XLK",
-                "consumer discretionary": "XLY",
-                "consumer cyclical": "XLY",  # Yahoo Finance uses "Consumer Cyclical"
-                "consumer staples": "XLP",
-                "consumer defensive": "XLP",  # Yahoo Finance uses "Consumer Defensive"
-                "energy": "XLE",
-                "financials": "XLF",
-                "financial services": "XLF",
-                "health care": "XLV",
-                "healthcare": "XLV",
-                "industrials": "XLI",
-                "materials": "XLB",
-                "utilities": "XLU",
-                "real estate": "XLRE",
-                "communication services": "XLC",
-                "communications": "XLC"
-            }
-            
-            sector_lower = sector.lower()
-            if sector_lower in sector_variations:
-                etf = sector_variations[sector_lower]
-                name = spdr_map[etf]
+            etf, name = map_sector_to_etf(sector)
+            if etf:
                 return etf, name
                     
             print(f"Warning: Could not map sector '{sector}' for {symbol} to any ETF")
@@ -119,17 +140,94 @@ def get_sector_etf(symbol, max_retries=3):
     
     return None, None
 
-def get_sector_constituents(etf):
+def _read_holdings_json(path):
+    """
+    Parsed holdings JSON, re-read only when the file changes
+    """
     try:
-        etf_ticker = yf.Ticker(etf)
-        holdings = etf_ticker.fund_holdings
-        if holdings is not None and not holdings.empty:
-            symbols = holdings['symbol'].dropna().unique().tolist()
-            return symbols
-        else:
-            return SECTOR_CONSTITUENTS_DATA.get(etf, [])
+        return _read_holdings_json_cached(path, os.path.getmtime(path))
+    except OSError:
+        return {}
+    except ValueError as e:
+        print(f"Warning: Could not parse holdings file {path}: {str(e)}")
+        return {}
+
+@lru_cache(maxsize=4)
+def _read_holdings_json_cached(path, mtime):
+    with open(path) as f:
+        return json.load(f)
+
+def _load_holdings_file(etf, path=HOLDINGS_FILE):
+    """
+    Read one ETF's holdings from the JSON written by script_get_symbols.py.
+    Supports both the weighted format ([{"symbol", "name", "weight"}, ...]) and
+    the older plain symbol lists (weights unknown).
+    """
+    entries = _read_holdings_json(path).get(etf)
+    if not entries:
+        return None
+    if isinstance(entries[0], dict):
+        return pd.Series({e["symbol"]: e.get("weight") for e in entries}, dtype=float)
+    return pd.Series(float('nan'), index=entries)
+
+# Seconds live ETF holdings from Yahoo are reused (holdings change at most daily)
+HOLDINGS_TTL_SECONDS = 3600
+
+_holdings_lock = threading.Lock()
+_holdings_cache = {}   # etf -> (holdings Series or None, fetched_at)
+
+def _fetch_top_holdings(etf):
+    """
+    Top holdings weights from Yahoo, cached per ETF for HOLDINGS_TTL_SECONDS.
+    Failures are cached too so a missing endpoint is not retried on every render.
+    """
+    with _holdings_lock:
+        entry = _holdings_cache.get(etf)
+    if entry and time.time() - entry[1] < HOLDINGS_TTL_SECONDS:
+        return None if entry[0] is None else entry[0].copy()
+
+    holdings = None
+    try:
+        top = yf.Ticker(etf).funds_data.top_holdings
+        if top is not None and not top.empty:
+            holdings = top['Holding Percent'].astype(float)
     except Exception as e:
-        return SECTOR_CONSTITUENTS_DATA.get(etf, [])
+        print(f"Warning: Could not fetch holdings for {etf}: {str(e)}")
+
+    with _holdings_lock:
+        _holdings_cache[etf] = (holdings, time.time())
+    return None if holdings is None else holdings.copy()
+
+def clear_holdings_cache():
+    with _holdings_lock:
+        _holdings_cache.clear()
+
+def get_sector_holdings(etf):
+    """
+    Get an ETF's holdings as a Series of portfolio weights (fractions of the fund)
+    indexed by symbol, largest first. Weights are NaN when only symbols are known.
+    """
+    holdings = None
+    try:
+        holdings = _load_holdings_file(etf)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not read holdings file for {etf}: {str(e)}")
+
+    if holdings is None or holdings.empty:
+        holdings = _fetch_top_holdings(etf)
+
+    if holdings is None or holdings.empty:
+        holdings = pd.Series(float('nan'), index=SECTOR_CONSTITUENTS_DATA.get(etf, []), dtype=float)
+
+    holdings.index.name = "Ticker"
+    holdings.name = "Weight"
+    return holdings.sort_values(ascending=False, na_position='last')
+
+def get_sector_constituents(etf):
+    """
+    Get an ETF's constituent symbols, largest holdings first
+    """
+    return get_sector_holdings(etf).index.tolist()
 
 def sector_constituents(etf):
     """
@@ -137,7 +235,20 @@ def sector_constituents(etf):
     """
     return get_sector_constituents(etf)
 
-def get_comparative_metrics(symbols, max_retries=2):
+# Ollama models offered in the app and accepted by the API
+MODEL_OPTIONS = ["llama3.2", "llama3.1", "mistral", "codellama", "qwen2.5"]
+
+# Ticker.info fields used by the stock overview, company description and AI report
+ANALYSIS_FIELDS = [
+    "longName", "sector", "industry", "longBusinessSummary",
+    "currentPrice", "marketCap", "trailingPE", "forwardPE", "priceToBook", "pegRatio", "recommendationMean"
+]
+
+# Ticker.info fields behind the comparison table columns
+COMPARATIVE_FIELDS = ["trailingPE", "priceToBook", "pegRatio", "forwardPE", "marketCap", "recommendationMean"]
+
+def get_comparative_metrics(symbols, max_retries=2, planner=None):
+    planner = planner or new_fetch_planner()
     rows = []
     for s in symbols:
         for attempt in range(max_retries):
@@ -146,11 +257,10 @@ def get_comparative_metrics(symbols, max_retries=2):
                 if attempt > 0:
                     time.sleep(random.uniform(0.5, 1.5))
                 
-                t = yf.Ticker(s)
-                info = t.info
+                info, ok = planner.fetch(s, COMPARATIVE_FIELDS, with_status=True)
                 
                 # Check if we got valid data
-                if not info or len(info) < 5:  # Basic check for valid response
+                if not ok:  # Heavy request returned no usable data
                     print(f"Warning: Invalid data for {s} on attempt {attempt + 1}")
                     if attempt == max_retries - 1:
                         continue
@@ -188,3 +298,241 @@ def get_comparative_metrics(symbols, max_retries=2):
     df = df.set_index("Ticker")
     return df.sort_values("P/E", na_position='last')  # Put NaN values at the end
 
+# Price multiples are aggregated with a weighted harmonic mean (equivalent to total
+# market value over total earnings/book for the basket); other metrics arithmetically
+HARMONIC_METRICS = ["P/E", "Forward P/E", "P/B"]
+ARITHMETIC_METRICS = ["PEG", "Analyst Rating"]
+
+def compute_weighted_sector_aggregates(comp_df, weights=None):
+    """
+    Weighted sector aggregates in a single vectorized reduction.
+
+    Uses the ETF holding weights when known, otherwise the peers' market caps.
+    Returns {metric: {"weighted", "coverage", "method", "basis"}} where coverage is
+    the share of the total weight that had data for that metric (the fraction of
+    the ETF when ETF weights are used).
+    """
+    if comp_df is None or comp_df.empty:
+        return {}
+
+    metrics = [m for m in HARMONIC_METRICS + ARITHMETIC_METRICS if m in comp_df.columns]
+    if not metrics:
+        return {}
+
+    w = weights.reindex(comp_df.index).to_numpy(dtype=float) if weights is not None else None
+    if w is not None and np.isfinite(w).any():
+        basis = "ETF weight"
+        total_weight = 1.0
+    elif "Market Cap" in comp_df.columns:
+        basis = "market cap"
+        w = comp_df["Market Cap"].to_numpy(dtype=float)
+        total_weight = np.nansum(w)
+    else:
+        return {}
+
+    values = comp_df[metrics].to_numpy(dtype=float)
+    harmonic = np.array([m in HARMONIC_METRICS for m in metrics])
+
+    # Harmonic metrics are averaged as yields (1/x) and inverted back afterwards
+    with np.errstate(divide='ignore', invalid='ignore'):
+        transformed = np.where(harmonic, 1.0 / values, values)
+    valid = np.isfinite(transformed) & np.isfinite(w)[:, None] & (w > 0)[:, None]
+    weight_matrix = np.where(valid, w[:, None], 0.0)
+
+    used = weight_matrix.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = (weight_matrix * np.where(valid, transformed, 0.0)).sum(axis=0) / used
+        aggregates = np.where(harmonic, 1.0 / means, means)
+
+    result = {}
+    for metric, value, weight_used, is_harmonic in zip(metrics, aggregates, used, harmonic):
+        if weight_used <= 0 or not np.isfinite(value):
+            continue
+        result[metric] = {
+            "weighted": round(float(value), 2),
+            "coverage": round(float(weight_used / total_weight), 3) if total_weight > 0 else None,
+            "method": "harmonic" if is_harmonic else "arithmetic",
+            "basis": basis
+        }
+    return result
+
+def summarize_sector_metrics(comp_df, weights=None):
+    """
+    Median, mean and weighted aggregate of each valuation metric across sector peers
+    """
+    if comp_df is None or comp_df.empty:
+        return {}
+    stats = {}
+    # Yahoo sometimes returns ratios as strings (e.g. "Infinity"); coerce once so
+    # every column gets the same plain and weighted statistics
+    numeric = comp_df.apply(pd.to_numeric, errors='coerce').replace([np.inf, -np.inf], np.nan)
+    for column in numeric.columns:
+        values = numeric[column].dropna()
+        if values.empty:
+            continue
+        stats[column] = {
+            "median": round(float(values.median()), 2),
+            "mean": round(float(values.mean()), 2),
+            "count": int(values.count())
+        }
+    for metric, aggregate in compute_weighted_sector_aggregates(numeric, weights).items():
+        stats.setdefault(metric, {}).update(aggregate)
+    return stats
+
+# Function to check if Ollama is running
+def check_ollama_status():
+    """
+    Check if Ollama service is running and accessible.
+    """
+    try:
+        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        return response.status_code == 200
+    except:
+        return False
+
+# Function to generate company description using Ollama
+def generate_company_description(stock_symbol, stock_info, selected_model):
+    """
+    Generate an 80-120 word company description using the selected Ollama model.
+    """
+    try:
+        # Prepare the prompt with company information
+        company_name = stock_info.get('longName', stock_symbol)
+        sector = stock_info.get('sector', 'N/A')
+        industry = stock_info.get('industry', 'N/A')
+        market_cap = stock_info.get('marketCap', 0)
+        pe_ratio = stock_info.get('trailingPE', 0)
+        description = stock_info.get('longBusinessSummary', '')
+        
+        # Format market cap for readability
+        if market_cap and market_cap > 0:
+            if market_cap >= 1e12:
+                market_cap_str = f"${market_cap/1e12:.1f}T"
+            elif market_cap >= 1e9:
+                market_cap_str = f"${market_cap/1e9:.1f}B"
+            elif market_cap >= 1e6:
+                market_cap_str = f"${market_cap/1e6:.1f}M"
+            else:
+                market_cap_str = f"${market_cap:,.0f}"
+        else:
+            market_cap_str = "N/A"
+        
+        prompt = f"""You are a financial analyst. Write a concise, professional company overview for {company_name} ({stock_symbol}) in exactly 80-120 words. 
+
+Company Information:
+- Name: {company_name}
+- Symbol: {stock_symbol}
+- Sector: {sector}
+- Industry: {industry}
+- Market Cap: {market_cap_str}
+- P/E Ratio: {pe_ratio if pe_ratio else 'N/A'}
+- Business Description: {description[:500]}{'...' if len(description) > 500 else ''}
+
+Write a clear, informative overview that includes:
+1. What the company does
+2. Its market position
+3. Key business focus areas
+4. Current market context
+
+Keep it professional, factual, and exactly 80-120 words. Focus on the company's core business and market position."""
+
+        # Call Ollama API
+        url = "http://localhost:11434/api/generate"
+        payload = {
+            "model": selected_model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9,
+                "max_tokens": 200
+            }
+        }
+        
+        response = requests.post(url, json=payload, timeout=30)
+        
+        if response.status_code == 200:
+            result = response.json()
+            description = result.get('response', '').strip()
+            
+            # Clean up the response
+            if description.startswith('```'):
+                description = description.split('\n', 1)[1] if '\n' in description else description
+            if description.endswith('```'):
+                description = description.rsplit('\n', 1)[0] if '\n' in description else description
+            
+            return description
+        else:
+            return f"**{stock_symbol}** is currently trading in the {sector} sector. Based on current valuation metrics, the stock shows mixed signals relative to sector peers."
+            
+    except Exception as e:
+        # Fallback to static description if LLM fails
+        sector = stock_info.get('sector', 'N/A')
+        return f"**{stock_symbol}** is currently trading in the {sector} sector. Based on current valuation metrics, the stock shows mixed signals relative to sector peers."
+
+# Function to generate a full investment report using Ollama
+def generate_investment_report(inputs, progress_callback=None, target_words=800):
+    """
+    Generate an investment analysis of a stock against its sector peers with the
+    selected Ollama model. The response is streamed so progress_callback(fraction)
+    can report how far along generation is. Raises on failure.
+    """
+    symbol = inputs["symbol"]
+    metrics = inputs.get("metrics", {})
+    sector_stats = inputs.get("sector_stats", {})
+
+    metric_lines = "\n".join(f"- {name}: {value if value is not None else 'N/A'}" for name, value in metrics.items())
+    sector_lines = "\n".join(
+        f"- {name}: median {s['median']}, mean {s['mean']} ({s['count']} peers)"
+        + (f", {s['basis']}-weighted {s['method']} mean {s['weighted']}" if 'weighted' in s else "")
+        for name, s in sector_stats.items()
+    ) or "- No sector peer data available"
+
+    prompt = f"""You are a financial analyst. Write an investment analysis of {inputs.get('company') or symbol} ({symbol}) of about {target_words} words.
+
+Sector: {inputs.get('sector_name') or 'N/A'} (benchmark ETF: {inputs.get('sector_etf') or 'N/A'})
+
+Company valuation metrics:
+{metric_lines}
+
+Sector peer statistics:
+{sector_lines}
+
+Structure the report with these Markdown sections:
+## Investment Overview
+## Valuation Metrics
+## Analysis
+## Conclusion
+
+Compare each metric against the sector statistics, explain what the differences imply, and conclude whether the stock looks overvalued, fairly valued or undervalued relative to its sector. Only use the numbers given above."""
+
+    payload = {
+        "model": inputs["model"],
+        "prompt": prompt,
+        "stream": True,
+        "options": {
+            "temperature": 0.3,
+            "top_p": 0.9
+        }
+    }
+
+    response = requests.post("http://localhost:11434/api/generate", json=payload, stream=True, timeout=300)
+    if response.status_code != 200:
+        raise RuntimeError(f"Ollama returned status {response.status_code}")
+
+    chunks = []
+    for line in response.iter_lines():
+        if not line:
+            continue
+        data = json.loads(line)
+        chunks.append(data.get("response", ""))
+        if progress_callback:
+            words = len("".join(chunks).split())
+            progress_callback(min(0.95, words / target_words))
+        if data.get("done"):
+            break
+
+    report = "".join(chunks).strip()
+    if not report:
+        raise RuntimeError("Ollama returned an empty report")
+    return report